@@ -74,4 +74,5 @@ with DAG(
         python_callable=task_test_scaler,
     )
 
-    init_db >> fix_models >> test_scaler
+    # init_db has no dependency on the model files, so it runs in parallel.
+    fix_models >> test_scaler
@@ -1,11 +1,18 @@
 from psycopg2.extras import execute_values
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import copy
+import csv
+import io
 import os
+import queue
+import uuid
 import joblib
 import logging
 import numpy as np
 import pandas as pd
 from typing import List, Dict, Any
-from db import get_db  # using existing Database class from project
+from db import get_db, clear_read_cache  # using existing Database class from project
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_DIR = os.path.join(BASE_DIR, "models")
@@ -13,11 +20,31 @@ MODEL_DIR = os.path.join(BASE_DIR, "models")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=16)
+def _load_pickle(path: str, mtime: float):
+    return joblib.load(path)
+
+def _cached_load(path: str):
+    """joblib.load memoized on (absolute path, mtime). Shared object: copy before modifying."""
+    path = os.path.abspath(path)
+    return _load_pickle(path, os.path.getmtime(path))
+
 class DataIngestor:
     """Load CSV data into the database telemetry table."""
-    def __init__(self):
-        self.db = get_db()
-        self.batch_size = 1000
+    def __init__(self, db=None):
+        self.db = db or get_db()
+        self.batch_size = int(os.getenv("EXECUTE_VALUES_PAGE_SIZE", "10000"))
+        self.chunk_size = 50000
+        self.use_copy = os.getenv("INGEST_USE_COPY", "true").lower() != "false"
+        requested_workers = max(1, int(os.getenv("INGEST_COPY_WORKERS", "1")))
+        # getconn() raises instead of waiting, so leave pool room for the ingest transaction and the log writer
+        self.copy_workers = max(1, min(requested_workers, self.db.pool_max - 2, os.cpu_count() or 1))
+        if self.copy_workers < requested_workers:
+            logger.warning(
+                "⚠️ INGEST_COPY_WORKERS=%d capped to %d (DB_POOL_MAX=%d, %s CPUs)",
+                requested_workers, self.copy_workers, self.db.pool_max, os.cpu_count()
+            )
+        self.copy_block_rows = max(1, int(os.getenv("INGEST_COPY_BLOCK_ROWS", "10000")))
         self.required_columns = [
             'machineid', 'type', 'location', 'timestamp', 'enginetemperature',
             'fuelconsumption', 'vibrationlevel', 'humidity', 'pressure',
@@ -33,68 +60,286 @@ class DataIngestor:
             'Status_encoded': 'status_encoded', 'Timestamp_epoch': 'timestamp_epoch',
             'hour': 'hour', 'dayofweek': 'dayofweek', 'month': 'month'
         }
+        self.csv_dtypes = {
+            'MachineID': str, 'Type': str, 'Location': str,
+            'EngineTemperature': 'float32', 'FuelConsumption': 'float32',
+            'VibrationLevel': 'float32', 'Humidity': 'float32', 'Pressure': 'float32',
+            'PowerOutput': 'float32', 'OperatingHours': 'float32', 'Status': str,
+            'Status_encoded': 'Int16', 'Timestamp_epoch': 'Int64',
+            'hour': 'Int16', 'dayofweek': 'Int16', 'month': 'Int16'
+        }
+        self.fill_defaults = {
+            'enginetemperature': 75.0,
+            'fuelconsumption': 10.0,
+            'vibrationlevel': 3.0,
+            'humidity': 65.0,
+            'pressure': 950.0,
+            'poweroutput': 200.0,
+            'operatinghours': 0.0,
+            'status': 'Unknown'
+        }
 
     def ingest_csv(self, file_path: str) -> int:
+        stage = None
         try:
-            logger.info(f"📖 Reading CSV file: {file_path}")
-            df = pd.read_csv(file_path)
-            logger.info(f"📊 Loaded {len(df)} rows from CSV")
+            if not self.needs_ingest(file_path):
+                logger.info("⏭️ CSV unchanged since last ingest, skipping: %s", file_path)
+                return 0
 
-            df = self._convert_column_names(df)
-            df = self._clean_dataframe(df)
+            logger.info("📖 Reading CSV file: %s", file_path)
+            with self.db.connection() as conn:
+                # One set-based telemetry_latest refresh below instead of a trigger call per row
+                with conn.cursor() as cursor:
+                    self.db.defer_latest(cursor)
+                if self.copy_workers > 1:
+                    stage = f"telemetry_stage_{uuid.uuid4().hex}"
+                    count = self._insert_chunks_parallel(conn, file_path, stage)
+                elif self.use_copy:
+                    count = self._copy_csv_stream(conn, file_path)
+                else:
+                    count = self._insert_chunks(conn, file_path)
 
-            count = self._insert_rows(df)
-            logger.info(f"🎉 Successfully ingested {count} rows")
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        INSERT INTO telemetry_meta (key, value) VALUES (%s, %s)
+                        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+                        """,
+                        (self._signature_key(file_path), self._csv_signature(file_path))
+                    )
+                self.db.refresh_latest()
+            clear_read_cache()
+            logger.info("🎉 Successfully ingested %d rows", count)
             return count
         except Exception as e:
-            logger.error(f"❌ Ingestion failed: {e}")
+            logger.error("❌ Ingestion failed: %s", e)
             raise
+        finally:
+            if stage:
+                # After the ingest transaction has ended, so nothing still holds a lock on it
+                with self.db.autocommit_connection() as conn, conn.cursor() as cursor:
+                    cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+
+    def _copy_csv_stream(self, conn, file_path: str) -> int:
+        """COPY the file straight from disk, applying only the header mapping and fill defaults.
+        No DataFrame is built, so memory stays at the read buffer."""
+        with open(file_path, newline='') as f, conn.cursor() as cursor:
+            # Safe for a re-runnable CSV load: a crash can only lose the last few commits
+            cursor.execute("SET LOCAL synchronous_commit = off")
+            # Timestamps are passed through as written in the CSV (e.g. 9/1/2025 0:00), so pin the
+            # field order PostgreSQL parses them with instead of inheriting the server's DateStyle
+            cursor.execute("SET LOCAL DateStyle = 'ISO, MDY'")
+            query = f"""
+    COPY telemetry (
+        {", ".join(self.required_columns)}
+    ) FROM STDIN WITH CSV
+    """
+            cursor.copy_expert(query, _CsvCopyStream(self._copy_lines(f)))
+            logger.info("⚡ Streamed COPY complete: %d rows", cursor.rowcount)
+            return cursor.rowcount
+
+    def _copy_lines(self, f):
+        """Yield blocks of COPY-ready CSV text (columns in required_columns order, defaults filled)"""
+        reader = csv.reader(f)
+        columns = [self.column_mapping.get(c, c.lower()) for c in next(reader)]
+        positions = [columns.index(c) if c in columns else None for c in self.required_columns]
+        reorder = positions != list(range(len(columns)))
+        # An empty unquoted field is NULL in COPY CSV
+        fills = [str(self.fill_defaults.get(c, '')) for c in self.required_columns]
+
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator='\n')
+        n = 0
+        for row in reader:
+            # Blank lines are skipped, as pandas does on the DataFrame path
+            if not row:
+                continue
+            if len(row) != len(columns):
+                raise ValueError(
+                    f"CSV line {reader.line_num}: expected {len(columns)} fields, got {len(row)}"
+                )
+            if reorder:
+                row = [row[i] if i is not None else '' for i in positions]
+            writer.writerow([value or fill for value, fill in zip(row, fills)])
+            n += 1
+            if n % self.copy_block_rows == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    def _read_chunks(self, file_path: str):
+        reader = pd.read_csv(
+            file_path, chunksize=self.chunk_size, usecols=list(self.column_mapping.keys()),
+            dtype=self.csv_dtypes, parse_dates=['Timestamp']
+        )
+        for chunk in reader:
+            logger.info("📊 Loaded %d rows from CSV", len(chunk))
+
+            chunk = self._convert_column_names(chunk)
+            yield self._clean_dataframe(chunk)
+
+    def _insert_chunks(self, conn, file_path: str) -> int:
+        """Insert every chunk in conn's current transaction (committed by ingest_csv)"""
+        count = 0
+        with conn.cursor() as cursor:
+            # Safe for a re-runnable CSV load: a crash can only lose the last few commits
+            cursor.execute("SET LOCAL synchronous_commit = off")
+            for chunk in self._read_chunks(file_path):
+                count += self._insert_rows(cursor, chunk)
+        return count
+
+    def _insert_chunks_parallel(self, conn, file_path: str, stage: str) -> int:
+        """Spread chunks over copy_workers pooled connections writing into the `stage` table, then
+        publish it to telemetry in conn's transaction, so the file lands all at once or not at all.
+        The caller drops `stage` once conn's transaction has ended."""
+        with self.db.autocommit_connection() as ddl_conn, ddl_conn.cursor() as cursor:
+            # Defaults included, so ids still come from the telemetry sequence
+            cursor.execute(f"CREATE UNLOGGED TABLE {stage} (LIKE telemetry INCLUDING DEFAULTS)")
+
+        conns = []
+        idle = queue.Queue()
+
+        def insert_chunk(chunk):
+            worker_conn = idle.get()
+            try:
+                with worker_conn.cursor() as cursor:
+                    return self._insert_rows(cursor, chunk, table=stage)
+            finally:
+                idle.put(worker_conn)
+
+        futures = []
+        try:
+            for _ in range(self.copy_workers):
+                worker_conn = self.db.pool.getconn()
+                conns.append(worker_conn)
+                idle.put(worker_conn)
+
+            with ThreadPoolExecutor(max_workers=self.copy_workers) as executor:
+                for chunk in self._read_chunks(file_path):
+                    # Keep at most one pending chunk per worker so parsing can't run ahead of the writers
+                    if len(futures) >= self.copy_workers:
+                        futures[-self.copy_workers].result()
+                    futures.append(executor.submit(insert_chunk, chunk))
+            count = sum(f.result() for f in futures)
+            # Only the private stage table is committed here; telemetry is untouched until the publish below
+            for worker_conn in conns:
+                worker_conn.commit()
+        except Exception:
+            for worker_conn in conns:
+                if not worker_conn.closed:
+                    worker_conn.rollback()
+            raise
+        finally:
+            for worker_conn in conns:
+                self.db.pool.putconn(worker_conn, close=bool(worker_conn.closed))
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"INSERT INTO telemetry SELECT * FROM {stage}")
+        logger.info("⚡ Parallel load on %d connections published in one transaction", len(conns))
+        return count
+
+    def needs_ingest(self, file_path: str) -> bool:
+        """False when the file's size and mtime match the last successful ingest"""
+        res = self.db.execute_query(
+            "SELECT value FROM telemetry_meta WHERE key = %s", (self._signature_key(file_path),)
+        )
+        return not res or res[0]['value'] != self._csv_signature(file_path)
+
+    def _signature_key(self, file_path: str) -> str:
+        return f"csv_sig:{os.path.abspath(file_path)}"
+
+    def _csv_signature(self, file_path: str) -> str:
+        return f"{os.path.getsize(file_path)}:{os.path.getmtime(file_path):.0f}"
 
     def _convert_column_names(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_copy = df.copy()
-        mapping = {col: self.column_mapping.get(col, col.lower()) for col in df.columns}
-        df_copy.rename(columns=mapping, inplace=True)
-        return df_copy
+        return df.rename(columns={col: self.column_mapping.get(col, col.lower()) for col in df.columns})
 
     def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_clean = df.fillna({
-            'enginetemperature': 75.0,
-            'fuelconsumption': 10.0,
-            'vibrationlevel': 3.0,
-            'humidity': 65.0,
-            'pressure': 950.0,
-            'poweroutput': 200.0,
-            'operatinghours': 0.0,
-            'status': 'Unknown'
-        })
-        df_clean.columns = [c.lower() for c in df_clean.columns]
-        return df_clean
+        df.fillna(self.fill_defaults, inplace=True)
+        return df
+
 
 
+    def _insert_rows(self, cursor, df: pd.DataFrame, table: str = "telemetry") -> int:
+        """FAST batch insert using COPY, or execute_values when COPY is disabled.
+        Runs inside the caller's transaction; ingest_csv commits once per file."""
+        if list(df.columns) != self.required_columns:
+            df = df.reindex(columns=self.required_columns)
 
-    def _insert_rows(self, df: pd.DataFrame) -> int:
-        """FAST batch insert using psycopg2.execute_values"""
-        rows = []
-        for _, row in df.iterrows():
-            values = tuple(row.get(c, None) for c in self.required_columns)
-            rows.append(values)
+        try:
+            if self.use_copy:
+                self._copy_rows(cursor, df, table)
+            else:
+                self._execute_values_rows(cursor, df, table)
+            logger.info("⚡ Batch insert complete: %d rows", len(df))
+            return len(df)
+        except Exception as e:
+            logger.error("❌ Batch insert failed: %s", e)
+            raise
+
+    def _copy_rows(self, cursor, df: pd.DataFrame, table: str = "telemetry"):
+        buf = io.StringIO()
+        df.to_csv(buf, index=False, header=False, na_rep='\\N')
+        buf.seek(0)
+
+        query = f"""
+    COPY {table} (
+        {", ".join(self.required_columns)}
+    ) FROM STDIN WITH CSV NULL '\\N'
+    """
+        cursor.copy_expert(query, buf)
+
+    def _execute_values_rows(self, cursor, df: pd.DataFrame, table: str = "telemetry"):
+        float32_columns = list(df.select_dtypes('float32').columns)
+        if float32_columns:
+            # Widening float32 straight to float64 adds digits the CSV never had (73.7 -> 73.69999694824219)
+            df = df.astype({c: str for c in float32_columns}).astype({c: 'float64' for c in float32_columns})
+        # psycopg2 adapts neither the numpy ints of nullable Int columns nor NA/NaN as NULL
+        object_columns = [
+            c for c in df.columns
+            if (pd.api.types.is_extension_array_dtype(df[c]) and pd.api.types.is_integer_dtype(df[c]))
+            or df[c].hasnans
+        ]
+        if object_columns:
+            df = df.astype({c: object for c in object_columns})
+            df[object_columns] = df[object_columns].where(df[object_columns].notna(), None)
+        rows = list(df.itertuples(index=False, name=None))
+        template = "(" + ",".join(["%s"] * len(self.required_columns)) + ")"
 
         query = f"""
-    INSERT INTO telemetry (
+    INSERT INTO {table} (
         {", ".join(self.required_columns)}
     ) VALUES %s
     """
+        execute_values(cursor, query, rows, template=template, page_size=self.batch_size)
 
-        try:
-            with self.db.conn.cursor() as cursor:
-                execute_values(cursor, query, rows, page_size=1000)
-            self.db.conn.commit()
-            logger.info(f"⚡ Batch insert complete: {len(rows)} rows")
-            return len(rows)
-        except Exception as e:
-            logger.error(f"❌ Batch insert failed: {e}")
-            self.db.conn.rollback()
-            raise
+class _CsvCopyStream(io.TextIOBase):
+    """Minimal readable text stream over a generator of strings, for cursor.copy_expert"""
+    def __init__(self, blocks):
+        self._blocks = blocks
+        self._block = ""
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        parts = []
+        while size != 0:
+            if self._pos >= len(self._block):
+                self._block = next(self._blocks, None)
+                self._pos = 0
+                if self._block is None:
+                    self._block = ""
+                    break
+            end = len(self._block) if size < 0 else self._pos + size
+            part = self._block[self._pos:end]
+            self._pos += len(part)
+            parts.append(part)
+            if size > 0:
+                size -= len(part)
+        return "".join(parts)
 
 class DatabaseInitializer:
     """Initialize and verify database tables, and optionally ingest data."""
@@ -105,24 +350,40 @@ class DatabaseInitializer:
         try:
             logger.info("🚀 Starting complete database setup...")
             self.db.init_db()
-            if csv_file_path and os.path.exists(csv_file_path):
-                ingestor = DataIngestor()
-                count = ingestor.ingest_csv(csv_file_path)
-                logger.info(f"📊 {count} rows inserted into telemetry.")
+            ingestor = DataIngestor(db=self.db)
+            if csv_file_path and os.path.exists(csv_file_path) and not ingestor.needs_ingest(csv_file_path):
+                logger.info("⏭️ %s unchanged since last ingest, skipping load.", csv_file_path)
+            elif csv_file_path and os.path.exists(csv_file_path):
+                self.db.drop_telemetry_indexes()
+                try:
+                    count = ingestor.ingest_csv(csv_file_path)
+                finally:
+                    self.db.create_indexes()
+                # Refresh planner statistics (and the pg_class estimate used by verify_database_setup)
+                self.db.execute_query("ANALYZE telemetry")
+                logger.info("📊 %d rows inserted into telemetry.", count)
             self.verify_database_setup()
             logger.info("🎊 Database setup completed successfully!")
         except Exception as e:
-            logger.error(f"❌ Database setup failed: {e}")
+            logger.error("❌ Database setup failed: %s", e)
 
     def verify_database_setup(self):
         tables = ['telemetry', 'user_query_log', 'predictions']
         for t in tables:
             try:
-                res = self.db.execute_query(f"SELECT COUNT(*) as count FROM {t}")
+                # Planner estimate instead of COUNT(*), which would scan the whole table
+                res = self.db.execute_query(
+                    "SELECT reltuples::bigint AS count FROM pg_class WHERE oid = to_regclass(%s)", (t,)
+                )
                 count = res[0]['count'] if res else 0
-                logger.info(f"📋 {t}: {count} rows")
+                if count >= 0:
+                    logger.info("📋 %s: ~%d rows", t, count)
+                else:
+                    # Never analyzed: fall back to an O(1) emptiness check
+                    res = self.db.execute_query(f"SELECT EXISTS (SELECT 1 FROM {t}) AS has_rows")
+                    logger.info("📋 %s: %s", t, 'non-empty' if res[0]['has_rows'] else 'empty')
             except Exception as e:
-                logger.warning(f"⚠️ Could not check {t}: {e}")
+                logger.warning("⚠️ Could not check %s: %s", t, e)
 
 class FeatureNamesFixer:
     """Fix and normalize feature names for models and scalers."""
@@ -157,55 +418,64 @@ class FeatureNamesFixer:
     },
 }
     def fix_all_models(self) -> Dict[str, bool]:
-        results = {}
-        for intent, paths in self.model_paths.items():
-            results[intent + "_model"] = self.fix_model_features(paths['model'], intent)
-            results[intent + "_scaler"] = self.fix_scaler_features(paths['scaler'], intent)
-        return results
+        futures = {}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for intent, paths in self.model_paths.items():
+                futures[intent + "_model"] = executor.submit(self.fix_model_features, paths['model'], intent)
+                futures[intent + "_scaler"] = executor.submit(self.fix_scaler_features, paths['scaler'], intent)
+        return {name: future.result() for name, future in futures.items()}
 
     def fix_model_features(self, model_path: str, model_type: str) -> bool:
         try:
             if not os.path.exists(model_path):
-                logger.error(f"❌ Model file not found: {model_path}")
+                logger.error("❌ Model file not found: %s", model_path)
                 return False
 
-            model = joblib.load(model_path)
+            model = _cached_load(model_path)
             if hasattr(model, 'feature_names_in_'):
                 try:
                     original = list(model.feature_names_in_)
                     new_features = [self.feature_mapping.get(f, f.lower()) for f in original]
+                    if new_features == original:
+                        logger.info("ℹ️ Feature names for %s already normalized, skipped.", model_type)
+                        return True
                     try:
+                        model = copy.copy(model)
                         model.feature_names_in_ = new_features
-                        logger.info(f"✅ Updated feature names for {model_type}: {new_features}")
+                        logger.info("✅ Updated feature names for %s: %s", model_type, new_features)
                     except AttributeError:
-                        logger.warning(f"⚠️ Cannot modify feature_names_in_ for {model_type} (read-only). Skipped update.")
-                    joblib.dump(model, model_path)
-                    logger.info(f"💾 Saved model file: {model_path}")
+                        logger.warning("⚠️ Cannot modify feature_names_in_ for %s (read-only). Skipped update.", model_type)
+                    joblib.dump(model, model_path, compress=0)
+                    logger.info("💾 Saved model file: %s", model_path)
                 except Exception as e:
-                    logger.warning(f"⚠️ Could not fix features for {model_type}: {e}")
+                    logger.warning("⚠️ Could not fix features for %s: %s", model_type, e)
             else:
-                logger.info(f"ℹ️ Model {model_type} has no feature_names_in_ attribute, skipped.")
+                logger.info("ℹ️ Model %s has no feature_names_in_ attribute, skipped.", model_type)
             return True
         except Exception as e:
-            logger.error(f"❌ Failed to fix model features ({model_type}): {e}")
+            logger.error("❌ Failed to fix model features (%s): %s", model_type, e)
             return False
 
     def fix_scaler_features(self, scaler_path: str, scaler_type: str) -> bool:
         try:
             if not os.path.exists(scaler_path):
-                logger.error(f"❌ Scaler file not found: {scaler_path}")
+                logger.error("❌ Scaler file not found: %s", scaler_path)
                 return False
 
-            scaler = joblib.load(scaler_path)
+            scaler = _cached_load(scaler_path)
             if hasattr(scaler, 'feature_names_in_'):
                 original = list(scaler.feature_names_in_)
                 new_features = [self.feature_mapping.get(f, f.lower()) for f in original]
+                if new_features == original:
+                    logger.info("ℹ️ Scaler features for %s already normalized, skipped.", scaler_type)
+                    return True
+                scaler = copy.copy(scaler)
                 scaler.feature_names_in_ = new_features
-                joblib.dump(scaler, scaler_path)
-                logger.info(f"✅ Fixed scaler features for {scaler_type}: {new_features}")
+                joblib.dump(scaler, scaler_path, compress=0)
+                logger.info("✅ Fixed scaler features for %s: %s", scaler_type, new_features)
             return True
         except Exception as e:
-            logger.error(f"❌ Failed to fix scaler features ({scaler_type}): {e}")
+            logger.error("❌ Failed to fix scaler features (%s): %s", scaler_type, e)
             return False
 
 class ScalerTester:
@@ -216,18 +486,37 @@ class ScalerTester:
             'poweroutput', 'operatinghours', 'timestamp_epoch', 'hour',
             'dayofweek', 'month'
         ]
+        self._cache = {}
 
     def test_scaler_with_real_data(self, scaler_path: str, features_dict: Dict[str, float]):
         try:
             if not os.path.exists(scaler_path):
-                logger.error(f"❌ Scaler not found: {scaler_path}")
+                logger.error("❌ Scaler not found: %s", scaler_path)
                 return
-            scaler = joblib.load(scaler_path)
-            feature_vector = np.array([[features_dict.get(f, 0.0) for f in self.feature_order]])
-            scaled = scaler.transform(feature_vector)
-            logger.info(f"✅ Scaled output for {scaler_path}: {scaled[0]}")
+            if scaler_path not in self._cache:
+                self._cache[scaler_path] = self._load(scaler_path)
+            params = self._cache[scaler_path]
+            feature_vector = np.fromiter(
+                (features_dict.get(f, 0.0) for f in self.feature_order),
+                dtype=np.float64, count=len(self.feature_order)
+            )
+            if isinstance(params, tuple):
+                mean, scale = params
+                scaled = (feature_vector - mean) / scale
+            else:
+                scaled = params.transform(feature_vector.reshape(1, -1))[0]
+            logger.info("✅ Scaled output for %s: %s", scaler_path, scaled)
         except Exception as e:
-            logger.error(f"❌ Scaler test failed: {e}")
+            logger.error("❌ Scaler test failed: %s", e)
+
+    def _load(self, scaler_path: str):
+        """Return (mean, scale) for StandardScaler-style scalers, else the scaler itself"""
+        scaler = joblib.load(scaler_path, mmap_mode='r')
+        if not (hasattr(scaler, 'mean_') and hasattr(scaler, 'scale_')):
+            return scaler
+        mean = np.array(scaler.mean_, dtype=np.float64) if scaler.mean_ is not None else 0.0
+        scale = np.array(scaler.scale_, dtype=np.float64) if scaler.scale_ is not None else 1.0
+        return mean, scale
 
 if __name__ == "__main__":
     print("=" * 80)
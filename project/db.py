@@ -1,21 +1,36 @@
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import re
+from psycopg2.extras import NamedTupleCursor, RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from cachetools import TTLCache
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from types import SimpleNamespace
 from dotenv import load_dotenv
+import copy
+import hashlib
+import io
+import atexit
+import queue
 import logging
-import json
-import numpy as np
+import orjson
+import asyncio
+import asyncpg
+import threading
+import weakref
 import time
+import uuid
 from pathlib import Path
 
 _db_instance = None
-
-_db_instance = None
+_db_instance_lock = threading.Lock()
 
 def get_db():
     global _db_instance
     if _db_instance is None:
-        _db_instance = Database()
+        with _db_instance_lock:
+            if _db_instance is None:
+                _db_instance = Database()
     return _db_instance
 
 
@@ -32,73 +47,294 @@ else:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def _copy_text(value):
+    """Render one value for COPY ... (FORMAT text)"""
+    if value is None:
+        return "\\N"
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value).translate(_COPY_TEXT_ESCAPES)
+
+def _np_default(value):
+    """orjson fallback for values OPT_SERIALIZE_NUMPY does not cover (e.g. np.float128, Decimal)"""
+    return value.item() if hasattr(value, 'item') else float(value)
+
+def _json_dumps(obj):
+    # NumPy scalars and arrays are encoded natively in C; _np_default only sees the leftovers
+    return orjson.dumps(obj, default=_np_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+_PLACEHOLDER = re.compile(r"%%|%s|%\(\w+\)s")
+
+@lru_cache(maxsize=256)
+def _plan(query):
+    """Prepared-statement name, $n-numbered text and PREPARE/EXECUTE text for a %s-style query, built once per SQL string.
+    Returns None for queries with %(name)s placeholders, which callers run unprepared."""
+    pieces, count, pos = [], 0, 0
+    for match in _PLACEHOLDER.finditer(query):
+        token = match.group()
+        if token.startswith("%("):
+            return None
+        pieces.append(query[pos:match.start()])
+        if token == "%%":
+            pieces.append("%")
+        else:
+            count += 1
+            pieces.append(f"${count}")
+        pos = match.end()
+    numbered_sql = "".join(pieces) + query[pos:]
+    name = "q" + hashlib.blake2b(query.encode(), digest_size=6).hexdigest()
+    args = f" ({', '.join(['%s'] * count)})" if count else ""
+    return SimpleNamespace(
+        name=name,
+        numbered_sql=numbered_sql,
+        prepare_sql=f"PREPARE {name} AS {numbered_sql}",
+        execute_sql=f"EXECUTE {name}{args}"
+    )
+
+def _conn_params():
+    """Connection settings from the environment, shared by Database and AsyncDatabase"""
+    port = os.getenv("DB_PORT")
+    return {
+        "host": os.getenv("DB_HOST"),
+        "database": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        # asyncpg needs an int; psycopg2 accepts either
+        "port": int(port) if port else None
+    }
+
+_METRIC_COLUMNS = frozenset({"enginetemperature", "humidity", "vibrationlevel", "fuelconsumption"})
+
+_STATS_QUERY = """
+SELECT 
+    COUNT(*) as record_count,
+    MIN(timestamp_epoch) as earliest_time,
+    MAX(timestamp_epoch) as latest_time,
+    COUNT(DISTINCT machineid) as machine_count
+FROM telemetry
+"""
+
+_MACHINE_STATS_QUERY = """
+SELECT 
+    COUNT(*) as record_count,
+    MIN(timestamp_epoch) as earliest_time,
+    MAX(timestamp_epoch) as latest_time,
+    AVG(enginetemperature) as avg_temperature,
+    AVG(fuelconsumption) as avg_fuel,
+    AVG(vibrationlevel) as avg_vibration
+FROM telemetry 
+WHERE machineid = %s
+"""
+
+def _top_n_query(column, order="DESC", alias=None, extra_filter=""):
+    """SQL ranking each machine's latest `column` value; LIMIT is the single %s parameter
+
+    Reads telemetry_latest unless extra_filter is given, which needs the full history.
+    """
+    if column not in _METRIC_COLUMNS:
+        raise ValueError(f"Unsupported metric column: {column}")
+    if order not in ("ASC", "DESC"):
+        raise ValueError(f"Unsupported sort order: {order}")
+    alias = alias or column
+    if extra_filter:
+        # The filter picks which rows count as a machine's latest, so it has to run before DISTINCT ON
+        return f"""
+    SELECT * FROM (
+        SELECT DISTINCT ON (machineid)
+            machineid,
+            {column} as {alias},
+            timestamp_epoch,
+            timestamp
+        FROM telemetry
+        WHERE {column} IS NOT NULL {extra_filter}
+        ORDER BY machineid, timestamp_epoch DESC
+    ) latest
+    ORDER BY {alias} {order} NULLS LAST, machineid
+    LIMIT %s
+    """
+    return f"""
+    SELECT
+        machineid,
+        {column} as {alias},
+        timestamp_epoch,
+        timestamp
+    FROM telemetry_latest
+    WHERE {column} IS NOT NULL
+    ORDER BY {alias} {order}, machineid
+    LIMIT %s
+    """
+
+_READ_CACHE = TTLCache(maxsize=256, ttl=float(os.getenv("READ_CACHE_TTL", "10")))
+_READ_CACHE_LOCK = threading.Lock()
+
+_MISSING = object()
+
+def _read_cached(fn):
+    """Memoize a read method in _READ_CACHE, keyed on method name + args.
+
+    Every caller gets its own deep copy, so mutating a result can't leak into the cache.
+    Empty results are not cached, since the error paths return them too.
+    """
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        with _READ_CACHE_LOCK:
+            hit = _READ_CACHE.get(key, _MISSING)
+        if hit is not _MISSING:
+            return copy.deepcopy(hit)
+        result = fn(self, *args, **kwargs)
+        if result:
+            with _READ_CACHE_LOCK:
+                _READ_CACHE[key] = copy.deepcopy(result)
+        return result
+    return wrapper
+
+def clear_read_cache():
+    """Drop all cached reads; called after every telemetry write"""
+    with _READ_CACHE_LOCK:
+        _READ_CACHE.clear()
+
 class Database:
     def __init__(self):
-        self.conn_params = {
-            "host": os.getenv("DB_HOST"),
-            "database": os.getenv("DB_NAME"),
-            "user": os.getenv("DB_USER"),
-            "password": os.getenv("DB_PASSWORD"),
-            "port": os.getenv("DB_PORT")
+        self.conn_params = _conn_params()
+        self.telemetry_columns = [
+            "machineid", "type", "location", "timestamp", "enginetemperature", "fuelconsumption",
+            "vibrationlevel", "humidity", "pressure", "poweroutput", "operatinghours", "status",
+            "status_encoded", "timestamp_epoch", "hour", "dayofweek", "month"
+        ]
+        self.latest_columns = ["id", *self.telemetry_columns, "ts_utc", "ts_epoch"]
+        self.copy_threshold = 10000
+        self.telemetry_indexes = {
+            "idx_telemetry_machine_id": "(machineid)",
+            "idx_telemetry_ts_epoch": "(ts_epoch)",
+            "idx_telemetry_composite": "(machineid, timestamp_epoch)",
+            # Time-range scans; rows arrive in roughly timestamp order, so BRIN replaces a btree here
+            "idx_telemetry_ts_brin": " USING BRIN (timestamp_epoch) WITH (pages_per_range = 128)",
+            "idx_telemetry_machine_ts_desc": "(machineid, timestamp_epoch DESC)",
+            "idx_telemetry_status_trgm": " USING gin (status gin_trgm_ops)"
+        }
+        # Superseded indexes that create_indexes() drops from existing databases
+        self.retired_indexes = ["idx_telemetry_timestamp_epoch"]
+        self.use_timescaledb = os.getenv("USE_TIMESCALEDB", "false").lower() in ("1", "true")
+        # Session-level PREPARE; leave off behind PgBouncer in transaction pooling mode
+        self.use_prepared = os.getenv("DB_PREPARED_STATEMENTS", "false").lower() in ("1", "true")
+        self.pool_max = int(os.getenv("DB_POOL_MAX", "16"))
+        self.pool = None
+        self._local = threading.local()
+        self.prepared_statements = {
+            "ins_telemetry": f"""INSERT INTO telemetry ({', '.join(self.telemetry_columns)}, ts_epoch)
+                VALUES ({', '.join(['%s'] * (len(self.telemetry_columns) + 1))})""",
         }
-        self.conn = None
+        self._prepared = weakref.WeakKeyDictionary()
+        self._prepare_lock = threading.Lock()
+        self.log_batch_size = 500
+        self.log_flush_interval = 0.1
+        # Bounded so a stalled database can't grow the backlog without limit; overflow is dropped
+        self._log_q = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_MAX", "10000")))
         self.connect()
+        threading.Thread(target=self._drain_logs, name="db-log-writer", daemon=True).start()
+        atexit.register(self.flush_logs)
 
     def connect(self):
         try:
-            self.conn = psycopg2.connect(**self.conn_params)
-            logger.info("✅ Connected to PostgreSQL database")
+            self.pool = ThreadedConnectionPool(minconn=2, maxconn=self.pool_max, **self.conn_params)
+            logger.info(f"✅ Connected to PostgreSQL database (pool of up to {self.pool_max} connections)")
         except Exception as e:
             logger.error(f"❌ Database connection failed: {e}")
             raise
 
-    def execute_query(self, query, params=None):
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for a multi-statement transaction.
+
+        Commits when the block exits cleanly and rolls back on error. execute_query calls
+        made on this thread inside the block run on the same connection and transaction.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self.pool.getconn()
+        self._local.conn = conn
         try:
-            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query, params)
-                
-                normalized_query = query.strip().upper()
-                is_select_query = (
-                    normalized_query.startswith('SELECT') or 
-                    normalized_query.startswith('WITH') or
-                    'SELECT' in normalized_query.split()[0:3]  
-                )
-                
-                if is_select_query:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self.pool.putconn(conn, close=bool(conn.closed))
+
+    @contextmanager
+    def autocommit_connection(self):
+        """Borrow a pooled connection in autocommit mode for DDL such as CREATE INDEX CONCURRENTLY"""
+        conn = self.pool.getconn()
+        conn.autocommit = True
+        try:
+            yield conn
+        finally:
+            if not conn.closed:
+                conn.autocommit = False
+            self.pool.putconn(conn, close=bool(conn.closed))
+
+    def _prepare(self, conn, query):
+        """PREPARE query on conn the first time it is used there and return its EXECUTE statement.
+        Returns query unchanged when prepared statements are disabled."""
+        plan = _plan(query) if self.use_prepared else None
+        if plan is None:
+            return query
+        with self._prepare_lock:
+            prepared = self._prepared.setdefault(conn, set())
+        if plan.name not in prepared:
+            with conn.cursor() as cursor:
+                cursor.execute(plan.prepare_sql)
+            prepared.add(plan.name)
+        return plan.execute_sql
+
+    def execute_query(self, query, params=None, cursor_factory=RealDictCursor, prepared=False):
+        try:
+            with self.connection() as conn, conn.cursor(cursor_factory=cursor_factory) as cursor:
+                cursor.execute(self._prepare(conn, query) if prepared else query, params)
+                # description is None for statements that return no result set
+                if cursor.description is not None:
                     return cursor.fetchall()
-                else:
-                    self.conn.commit()
-                    return cursor.rowcount
+                return cursor.rowcount
         except Exception as e:
             logger.error(f"❌ Query failed: {e}")
-            self.conn.rollback()
             raise
 
     def init_db(self):
         """Initialize database tables with optimized schema"""
+        # Hypertable unique constraints must include the partitioning column
+        telemetry_pk = "PRIMARY KEY (id, timestamp_epoch)" if self.use_timescaledb else "PRIMARY KEY (id)"
         queries = [
-            """
+            f"""
             CREATE TABLE IF NOT EXISTS telemetry (
-                id SERIAL PRIMARY KEY,
+                id SERIAL,
                 machineid VARCHAR(50),
                 type VARCHAR(50),
                 location VARCHAR(100),
                 timestamp TIMESTAMP,
-                enginetemperature FLOAT,
-                fuelconsumption FLOAT,
-                vibrationlevel FLOAT,
-                humidity FLOAT,
-                pressure FLOAT,
-                poweroutput FLOAT,
-                operatinghours FLOAT,
+                enginetemperature REAL,
+                fuelconsumption REAL,
+                vibrationlevel REAL,
+                humidity REAL,
+                pressure REAL,
+                poweroutput REAL,
+                operatinghours REAL,
                 status VARCHAR(50),
-                status_encoded INTEGER,
+                status_encoded SMALLINT,
                 timestamp_epoch BIGINT,
-                hour INTEGER,
-                dayofweek INTEGER,
-                month INTEGER,
+                hour SMALLINT,
+                dayofweek SMALLINT,
+                month SMALLINT,
                 ts_utc TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
-                ts_epoch BIGINT DEFAULT EXTRACT(EPOCH FROM CURRENT_TIMESTAMP)
+                ts_epoch BIGINT DEFAULT EXTRACT(EPOCH FROM CURRENT_TIMESTAMP),
+                {telemetry_pk}
             )
             """,
             """
@@ -122,67 +358,294 @@ class Database:
                 features JSONB,
                 ts_epoch BIGINT DEFAULT EXTRACT(EPOCH FROM CURRENT_TIMESTAMP)
             )
+            """,
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            """
+            CREATE TABLE IF NOT EXISTS telemetry_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            """,
+            # telemetry_latest used to be a materialized view
+            """
+            DO $$ BEGIN
+                IF EXISTS (SELECT 1 FROM pg_matviews WHERE matviewname = 'telemetry_latest') THEN
+                    DROP MATERIALIZED VIEW telemetry_latest;
+                END IF;
+            END $$
+            """,
+            "CREATE TABLE IF NOT EXISTS telemetry_latest (LIKE telemetry)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_telemetry_latest_machineid ON telemetry_latest (machineid)",
+            # Keep telemetry_latest current on every insert, from any client; bulk loads
+            # switch this off with defer_latest() and call refresh_latest() instead
+            f"""
+            CREATE OR REPLACE FUNCTION telemetry_latest_upsert() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF NEW.machineid IS NOT NULL
+                        AND coalesce(current_setting('telemetry.defer_latest', true), '') <> 'on' THEN
+                    {self._latest_upsert("SELECT (NEW).*")};
+                END IF;
+                RETURN NULL;
+            END $$
+            """,
             """
+            DROP TRIGGER IF EXISTS telemetry_latest_upsert ON telemetry;
+            CREATE TRIGGER telemetry_latest_upsert AFTER INSERT ON telemetry
+            FOR EACH ROW EXECUTE FUNCTION telemetry_latest_upsert()
+            """,
+            # Seed once from existing history (a no-op after the first run)
+            self._latest_upsert("""
+            SELECT DISTINCT ON (machineid) * FROM telemetry
+            WHERE machineid IS NOT NULL AND NOT EXISTS (SELECT 1 FROM telemetry_latest)
+            ORDER BY machineid, timestamp_epoch DESC NULLS LAST
+            """)
         ]
         
-        index_queries = [
-            "CREATE INDEX IF NOT EXISTS idx_telemetry_machine_id ON telemetry(machineid)",
-            "CREATE INDEX IF NOT EXISTS idx_telemetry_timestamp_epoch ON telemetry(timestamp_epoch)",
-            "CREATE INDEX IF NOT EXISTS idx_telemetry_ts_epoch ON telemetry(ts_epoch)",
-            "CREATE INDEX IF NOT EXISTS idx_query_log_epoch ON user_query_log(ts_epoch)",
-            "CREATE INDEX IF NOT EXISTS idx_predictions_epoch ON predictions(ts_epoch)",
-            "CREATE INDEX IF NOT EXISTS idx_telemetry_composite ON telemetry(machineid, timestamp_epoch)"
-        ]
+        # Autocommit: each statement commits on its own, so one failure can't undo the others
+        with self.autocommit_connection() as conn, conn.cursor() as cursor:
+            for query in queries:
+                try:
+                    cursor.execute(query)
+                    logger.info(f"✅ Executed table creation query")
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not execute query: {e}")
+                    continue
         
-        for query in queries:
-            try:
-                self.execute_query(query)
-                logger.info(f"✅ Executed table creation query")
-            except Exception as e:
-                logger.warning(f"⚠️ Could not execute query: {e}")
-                continue
+        if self.use_timescaledb:
+            self.enable_timescaledb()
+        self.create_indexes()
+
+    def enable_timescaledb(self):
+        """Convert telemetry into a TimescaleDB hypertable on event time, with a compression policy
+
+        Partitioned on timestamp_epoch (1-day integer chunks) so the range queries, which filter
+        on it, get chunk exclusion. No retention policy: rows loaded from the CSV are never
+        re-ingested once telemetry_meta records its signature, so dropped chunks would not come back.
+        """
+        try:
+            self.execute_query("CREATE EXTENSION IF NOT EXISTS timescaledb")
+            if self.execute_query(
+                "SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = 'telemetry'"
+            ):
+                logger.info("ℹ️ telemetry is already a hypertable")
+                return
+            with self.connection():
+                self.execute_query("""
+                    SELECT create_hypertable('telemetry', 'timestamp_epoch',
+                        chunk_time_interval => 86400, if_not_exists => TRUE, migrate_data => TRUE)
+                """)
+                # Integer time columns need a "now" in the same unit for policies
+                self.execute_query("""
+                    CREATE OR REPLACE FUNCTION telemetry_epoch_now() RETURNS BIGINT
+                    LANGUAGE SQL STABLE AS $$ SELECT EXTRACT(EPOCH FROM now())::BIGINT $$
+                """)
+                self.execute_query("SELECT set_integer_now_func('telemetry', 'telemetry_epoch_now')")
+                self.execute_query("""
+                    ALTER TABLE telemetry SET (
+                        timescaledb.compress,
+                        timescaledb.compress_segmentby = 'machineid',
+                        timescaledb.compress_orderby = 'timestamp_epoch DESC, id'
+                    )
+                """)
+                self.execute_query("SELECT add_compression_policy('telemetry', BIGINT '604800', if_not_exists => TRUE)")
+            logger.info("✅ telemetry converted to a TimescaleDB hypertable")
+        except Exception as e:
+            logger.warning(f"⚠️ TimescaleDB setup skipped, keeping a plain telemetry table: {e}")
+
+    def create_indexes(self):
+        """Create secondary indexes CONCURRENTLY (no-op for indexes that already exist)
+
+        Must not be called while this thread holds an open transaction on these tables,
+        since a concurrent build waits for every older transaction to finish.
+        """
+        indexes = [
+            (name, "", "telemetry", columns) for name, columns in self.telemetry_indexes.items()
+        ] + [
+            ("idx_query_log_epoch", "", "user_query_log", "(ts_epoch)"),
+            ("idx_predictions_epoch", "", "predictions", "(ts_epoch)")
+        ]
         
-        for query in index_queries:
-            try:
-                self.execute_query(query)
-                logger.info(f"✅ Created index")
-            except Exception as e:
-                logger.warning(f"⚠️ Could not create index: {e}")
-                continue
+        with self.autocommit_connection() as conn, conn.cursor() as cursor:
+            # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep skipping
+            cursor.execute("""
+                SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE NOT i.indisvalid
+            """)
+            invalid = {row[0] for row in cursor.fetchall()}
+            for name in self.retired_indexes:
+                concurrently = "" if self.use_timescaledb else "CONCURRENTLY "
+                cursor.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+            for name, unique, table, columns in indexes:
+                # TimescaleDB hypertables do not support concurrent index builds
+                concurrently = "" if self.use_timescaledb and table == "telemetry" else "CONCURRENTLY "
+                try:
+                    if name in invalid:
+                        cursor.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
+                    cursor.execute(f"CREATE {unique}INDEX {concurrently}IF NOT EXISTS {name} ON {table}{columns}")
+                    logger.info(f"✅ Created index")
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not create index: {e}")
+                    continue
+
+    def drop_telemetry_indexes(self):
+        """Drop secondary telemetry indexes ahead of a bulk load; create_indexes() restores them"""
+        for name in self.telemetry_indexes:
+            self.execute_query(f"DROP INDEX IF EXISTS {name}")
+        logger.info(f"🧹 Dropped {len(self.telemetry_indexes)} telemetry indexes for bulk load")
+
+    def _latest_upsert(self, source):
+        """INSERT the rows of `source` into telemetry_latest, keeping the newest timestamp_epoch per machine"""
+        columns = ", ".join(self.latest_columns)
+        excluded = ", ".join(f"EXCLUDED.{c}" for c in self.latest_columns)
+        return f"""
+            INSERT INTO telemetry_latest {source}
+            ON CONFLICT (machineid) DO UPDATE SET ({columns}) = ({excluded})
+            WHERE telemetry_latest.timestamp_epoch IS NULL
+                OR EXCLUDED.timestamp_epoch >= telemetry_latest.timestamp_epoch
+            """
+
+    def defer_latest(self, cursor):
+        """Skip the per-row telemetry_latest trigger for the rest of cursor's transaction.
+        The caller must run refresh_latest() once its rows are visible."""
+        cursor.execute("SET LOCAL telemetry.defer_latest = 'on'")
+
+    def refresh_latest(self):
+        """Fold every machine's newest telemetry row into telemetry_latest after a deferred bulk load"""
+        self.execute_query(self._latest_upsert("""
+            SELECT DISTINCT ON (machineid) * FROM telemetry
+            WHERE machineid IS NOT NULL
+            ORDER BY machineid, timestamp_epoch DESC NULLS LAST
+        """))
 
     def insert_telemetry(self, data):
-        query = """
-        INSERT INTO telemetry (
-            machineid, type, location, timestamp, enginetemperature, fuelconsumption,
-            vibrationlevel, humidity, pressure, poweroutput, operatinghours, status,
-            status_encoded, timestamp_epoch, hour, dayofweek, month
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        return self.execute_query(query, data)
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    self._prepare(conn, self.prepared_statements["ins_telemetry"]), (*data, int(time.time()))
+                )
+            clear_read_cache()
+            return 1
+        except Exception as e:
+            logger.error(f"❌ Telemetry insert failed: {e}")
+            raise
+
+    def insert_telemetry_bulk(self, rows):
+        """Insert many telemetry rows in one round trip (COPY for batches >= copy_threshold)"""
+        rows = list(rows)
+        if not rows:
+            return 0
+        columns = ", ".join(self.telemetry_columns) + ", ts_epoch"
+        # One client-side ts_epoch for the whole batch instead of a server-side EXTRACT per row
+        ts_epoch = int(time.time())
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                # One set-based telemetry_latest upsert below instead of a trigger call per row
+                self.defer_latest(cursor)
+                if len(rows) >= self.copy_threshold:
+                    buf = io.StringIO()
+                    row_end = f"\t{ts_epoch}\n"
+                    for row in rows:
+                        buf.write("\t".join(_copy_text(value) for value in row))
+                        buf.write(row_end)
+                    buf.seek(0)
+                    cursor.copy_expert(f"COPY telemetry ({columns}) FROM STDIN WITH (FORMAT text)", buf)
+                else:
+                    template = f"({', '.join(['%s'] * len(self.telemetry_columns))}, {ts_epoch})"
+                    execute_values(
+                        cursor, f"INSERT INTO telemetry ({columns}) VALUES %s", rows,
+                        template=template, page_size=1000
+                    )
+                machines = sorted({row[0] for row in rows if row[0] is not None})
+                cursor.execute(self._latest_upsert("""
+                    SELECT DISTINCT ON (machineid) * FROM telemetry
+                    WHERE machineid = ANY(%s)
+                    ORDER BY machineid, timestamp_epoch DESC NULLS LAST
+                """), (machines,))
+            clear_read_cache()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"❌ Bulk telemetry insert failed: {e}")
+            raise
 
     def log_user_query(self, role, query, intent, confidence, machine_id=None, target_time_epoch=None):
-        query = """
-        INSERT INTO user_query_log (role, query, intent, confidence, machine_id, target_time_epoch)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
+        """Queue a user_query_log row; the background writer inserts it with the next batch"""
         confidence = float(confidence) if confidence is not None else 0.0
-        return self.execute_query(query, (role, query, intent, confidence, machine_id, target_time_epoch))
+        return self._enqueue_log(
+            ("query", (role, query, intent, confidence, machine_id, target_time_epoch, int(time.time())))
+        )
 
     def log_prediction(self, machine_id, intent, numerical_answer, features):
-        query = """
-        INSERT INTO predictions (machine_id, intent, numerical_answer, features)
-        VALUES (%s, %s, %s, %s)
-        """
+        """Queue a predictions row; features are serialized now so later caller mutations don't leak in"""
         numerical_answer = float(numerical_answer) if numerical_answer is not None else 0.0
-        
-        features_serializable = {}
-        for key, value in features.items():
-            if hasattr(value, 'item'):
-                features_serializable[key] = value.item()
-            else:
-                features_serializable[key] = float(value) if isinstance(value, (int, float)) else value
-        
-        return self.execute_query(query, (machine_id, intent, numerical_answer, json.dumps(features_serializable)))
+        return self._enqueue_log(
+            ("prediction", (machine_id, intent, numerical_answer, _json_dumps(features), int(time.time())))
+        )
+
+    def _enqueue_log(self, item):
+        try:
+            self._log_q.put_nowait(item)
+            return 1
+        except queue.Full:
+            logger.warning(f"⚠️ Log queue full ({self._log_q.maxsize} rows), dropping {item[0]} log row")
+            return 0
+
+    def flush_logs(self, timeout=5.0):
+        """Wait up to `timeout` seconds for every queued log row to be written (also runs at interpreter exit).
+        Returns False if rows were still pending when the timeout expired."""
+        deadline = time.monotonic() + timeout
+        with self._log_q.all_tasks_done:
+            while self._log_q.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"⚠️ Gave up flushing logs with {self._log_q.unfinished_tasks} rows pending")
+                    return False
+                self._log_q.all_tasks_done.wait(remaining)
+        return True
+
+    def _drain_logs(self):
+        while True:
+            batch = [self._log_q.get()]
+            deadline = time.monotonic() + self.log_flush_interval
+            while len(batch) < self.log_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._log_q.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._write_logs(batch)
+
+    def _write_logs(self, batch):
+        queries = [row for kind, row in batch if kind == "query"]
+        predictions = [row for kind, row in batch if kind == "prediction"]
+        try:
+            if queries:
+                self._insert_log_rows("user_query_log", """
+                    INSERT INTO user_query_log (role, query, intent, confidence, machine_id, target_time_epoch, ts_epoch)
+                    VALUES %s
+                """, queries)
+            if predictions:
+                self._insert_log_rows("predictions", """
+                    INSERT INTO predictions (machine_id, intent, numerical_answer, features, ts_epoch) VALUES %s
+                """, predictions, template="(%s, %s, %s, %s::jsonb, %s)")
+        finally:
+            for _ in batch:
+                self._log_q.task_done()
+
+    def _insert_log_rows(self, table, query, rows, template=None):
+        """Insert rows in one transaction; if that fails, retry them one by one so a bad row only loses itself"""
+        try:
+            with self.connection() as conn, conn.cursor() as cursor:
+                execute_values(cursor, query, rows, template=template, page_size=self.log_batch_size)
+        except Exception as e:
+            if len(rows) == 1:
+                logger.error(f"❌ Dropped {table} log row {rows[0]!r}: {e}")
+                return
+            logger.warning(f"⚠️ Batch of {len(rows)} {table} rows failed, retrying row by row: {e}")
+            for row in rows:
+                self._insert_log_rows(table, query, [row], template)
 
     def get_latest_telemetry(self, machine_id, limit=1):
         query = """
@@ -200,105 +663,94 @@ class Database:
         ORDER BY timestamp_epoch
         """
         return self.execute_query(query, (machine_id, time_from_epoch, time_to_epoch))
+
+    def iter_telemetry_range(self, machine_id, time_from_epoch, time_to_epoch, itersize=2000):
+        """Stream get_telemetry_range rows as named tuples through a server-side cursor
+
+        Uses its own pooled connection rather than this thread's connection(), so writes made
+        while iterating are not part of the cursor's read-only transaction.
+        """
+        query = """
+        SELECT * FROM telemetry 
+        WHERE machineid = %s AND timestamp_epoch BETWEEN %s AND %s
+        ORDER BY timestamp_epoch
+        """
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor(f"telemetry_range_{uuid.uuid4().hex}", cursor_factory=NamedTupleCursor) as cursor:
+                cursor.itersize = itersize
+                cursor.execute(query, (machine_id, time_from_epoch, time_to_epoch))
+                yield from cursor
+        finally:
+            if not conn.closed:
+                conn.rollback()
+            self.pool.putconn(conn, close=bool(conn.closed))
     
+    @_read_cached
     def get_machine_list(self):
         """Get list of all available machines"""
         query = "SELECT DISTINCT machineid FROM telemetry ORDER BY machineid"
         return self.execute_query(query)
     
+    @_read_cached
     def get_telemetry_stats(self, machine_id=None):
         """Get basic statistics for telemetry data"""
         if machine_id:
-            query = """
-            SELECT 
-                COUNT(*) as record_count,
-                MIN(timestamp_epoch) as earliest_time,
-                MAX(timestamp_epoch) as latest_time,
-                AVG(enginetemperature) as avg_temperature,
-                AVG(fuelconsumption) as avg_fuel,
-                AVG(vibrationlevel) as avg_vibration
-            FROM telemetry 
-            WHERE machineid = %s
-            """
-            return self.execute_query(query, (machine_id,))
-        else:
-            query = """
-            SELECT 
-                COUNT(*) as record_count,
-                MIN(timestamp_epoch) as earliest_time,
-                MAX(timestamp_epoch) as latest_time,
-                COUNT(DISTINCT machineid) as machine_count
-            FROM telemetry
-            """
-            return self.execute_query(query)
+            return self.execute_query(_MACHINE_STATS_QUERY, (machine_id,))
+        return self.execute_query(_STATS_QUERY)
 
+    def _top_n_by_metric(self, column, limit, order="DESC", alias=None, extra_filter=""):
+        """Latest value of `column` per machine, ranked in SQL and cut to `limit` rows"""
+        return self.execute_query(_top_n_query(column, order, alias, extra_filter), (limit,))
+
+    @_read_cached
     def get_machines_with_highest_temperature(self, limit=5):
         """Get machines with highest current temperature"""
-        query = """
-        SELECT DISTINCT ON (machineid) 
-            machineid,
-            enginetemperature as temperature,
-            timestamp_epoch,
-            timestamp
-        FROM telemetry 
-        WHERE enginetemperature IS NOT NULL
-        ORDER BY machineid, timestamp_epoch DESC
-        """
-        all_machines = self.execute_query(query)
-        
-        sorted_machines = sorted(all_machines, key=lambda x: x['temperature'], reverse=True)
-        return sorted_machines[:limit]
+        return self._top_n_by_metric("enginetemperature", limit, "DESC", alias="temperature")
 
+    @_read_cached
     def get_machines_with_highest_humidity(self, limit=5):
         """Get machines with highest current humidity"""
-        query = """
-        SELECT DISTINCT ON (machineid) 
-            machineid,
-            humidity,
-            timestamp_epoch,
-            timestamp
-        FROM telemetry 
-        WHERE humidity IS NOT NULL
-        ORDER BY machineid, timestamp_epoch DESC
-        """
-        all_machines = self.execute_query(query)
-        
-        sorted_machines = sorted(all_machines, key=lambda x: x['humidity'], reverse=True)
-        return sorted_machines[:limit]
+        return self._top_n_by_metric("humidity", limit, "DESC")
 
+    @_read_cached
     def get_machines_with_highest_vibration(self, limit=5):
         """Get machines with highest current vibration level"""
-        query = """
-        SELECT DISTINCT ON (machineid) 
-            machineid,
-            vibrationlevel as vibration,
-            timestamp_epoch,
-            timestamp
-        FROM telemetry 
-        WHERE vibrationlevel IS NOT NULL
-        ORDER BY machineid, timestamp_epoch DESC
-        """
-        all_machines = self.execute_query(query)
-        
-        sorted_machines = sorted(all_machines, key=lambda x: x['vibration'], reverse=True)
-        return sorted_machines[:limit]
+        return self._top_n_by_metric("vibrationlevel", limit, "DESC", alias="vibration")
 
+    @_read_cached
     def get_machines_with_highest_fuel_consumption(self, limit=5):
         """Get machines with highest current fuel consumption"""
-        query = """
-        SELECT DISTINCT ON (machineid) 
-            machineid,
-            fuelconsumption as fuel,
-            timestamp_epoch,
-            timestamp
-        FROM telemetry 
-        WHERE fuelconsumption IS NOT NULL
-        ORDER BY machineid, timestamp_epoch DESC
+        return self._top_n_by_metric("fuelconsumption", limit, "DESC", alias="fuel")
+
+    @_read_cached
+    def get_all_highest(self, limit=5):
+        """All four get_machines_with_highest_* lists in one round trip, keyed by result alias"""
+        metrics = [("temperature", "enginetemperature"), ("humidity", "humidity"),
+                   ("vibration", "vibrationlevel"), ("fuel", "fuelconsumption")]
+        unpivot = ", ".join(f"('{alias}', l.{column})" for alias, column in metrics)
+        query = f"""
+        SELECT metric, machineid, value, timestamp_epoch, timestamp
+        FROM (
+            SELECT
+                m.metric, l.machineid, m.value, l.timestamp_epoch, l.timestamp,
+                ROW_NUMBER() OVER (PARTITION BY m.metric ORDER BY m.value DESC, l.machineid) AS rn
+            FROM telemetry_latest l
+            CROSS JOIN LATERAL (VALUES {unpivot}) AS m(metric, value)
+            WHERE m.value IS NOT NULL
+        ) ranked
+        WHERE rn <= %s
+        ORDER BY metric, rn
         """
-        all_machines = self.execute_query(query)
-        
-        sorted_machines = sorted(all_machines, key=lambda x: x['fuel'], reverse=True)
-        return sorted_machines[:limit]
+        results = {alias: [] for alias, _ in metrics}
+        for row in self.execute_query(query, (limit,)):
+            results[row["metric"]].append({
+                "machineid": row["machineid"],
+                row["metric"]: row["value"],
+                "timestamp_epoch": row["timestamp_epoch"],
+                "timestamp": row["timestamp"]
+            })
+        return results
 
     def get_machines_by_status(self, status_filter=None):
         """Get machines filtered by status - FIXED ACCURATE DATA"""
@@ -318,10 +770,12 @@ class Database:
                 WHERE status ILIKE %s AND machineid IS NOT NULL
                 ORDER BY machineid, timestamp_epoch DESC
                 """
-                result = self.execute_query(query, (f'%{status_filter}%',))
+                # Match status_filter literally: backslash is ILIKE's default escape character
+                escaped = status_filter.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                result = self.execute_query(query, (f'%{escaped}%',))
             else:
                 query = """
-                SELECT DISTINCT ON (machineid) 
+                SELECT 
                     machineid,
                     status,
                     enginetemperature,
@@ -330,9 +784,9 @@ class Database:
                     humidity,
                     timestamp_epoch,
                     timestamp
-                FROM telemetry 
-                WHERE machineid IS NOT NULL
-                ORDER BY machineid, timestamp_epoch DESC
+                FROM telemetry_latest 
+                WHERE status <> ''
+                ORDER BY machineid
                 """
                 result = self.execute_query(query)
             
@@ -344,27 +798,14 @@ class Database:
                 logger.info(f"📊 No machines found with status filter: {status_filter}")
                 return []
             
-            valid_machines = []
-            for machine in result:
-                if (isinstance(machine, dict) and 
-                    machine.get('machineid') and 
-                    machine.get('status')):
-                    
-                    if status_filter:
-                        actual_status = machine.get('status', '').lower()
-                        filter_status = status_filter.lower()
-                        if filter_status in actual_status:
-                            valid_machines.append(machine)
-                    else:
-                        valid_machines.append(machine)
-            
-            logger.info(f"📊 Found {len(valid_machines)} ACCURATE machines with status filter: {status_filter}")
-            return valid_machines
+            logger.info(f"📊 Found {len(result)} ACCURATE machines with status filter: {status_filter}")
+            return result
             
         except Exception as e:
             logger.error(f"❌ Error getting machines by status: {e}")
             return []
 
+    @_read_cached
     def get_machine_comparison_stats(self):
         """Get comparative statistics for all machines"""
         query = """
@@ -387,92 +828,115 @@ class Database:
         return self.execute_query(query)
     
 
+    @_read_cached
     def get_machines_with_lowest_temperature(self, limit=5):
         """Get machines with lowest current temperature"""
-        query = """
-        SELECT DISTINCT ON (machineid) 
-            machineid,
-            enginetemperature as temperature,
-            timestamp_epoch,
-            timestamp
-        FROM telemetry 
-        WHERE enginetemperature IS NOT NULL
-        ORDER BY machineid, timestamp_epoch DESC
-        """
-        all_machines = self.execute_query(query)
-        
-        sorted_machines = sorted(all_machines, key=lambda x: x['temperature'])
-        return sorted_machines[:limit]
+        return self._top_n_by_metric("enginetemperature", limit, "ASC", alias="temperature")
 
+    @_read_cached
     def get_machines_with_lowest_humidity(self, limit=5):
         """Get machines with lowest current humidity - FIXED VERSION"""
         try:
-            query = """
-            SELECT DISTINCT ON (machineid) 
-                machineid,
-                humidity,
-                timestamp_epoch,
-                timestamp
-            FROM telemetry 
-            WHERE humidity IS NOT NULL 
-            AND humidity > 0 
-            AND humidity <= 100
-            AND machineid IS NOT NULL
-            ORDER BY machineid, timestamp_epoch DESC
-            """
-            
-            all_machines = self.execute_query(query)
+            sorted_machines = self._top_n_by_metric(
+                "humidity", limit, "ASC",
+                extra_filter="AND humidity > 0 AND humidity <= 100 AND machineid IS NOT NULL"
+            )
             
-            if not all_machines or isinstance(all_machines, int):
+            if not sorted_machines or isinstance(sorted_machines, int):
                 logger.warning("⚠️ No valid humidity data found or query returned integer")
                 return []
             
-            sorted_machines = sorted(all_machines, key=lambda x: x['humidity'] if x['humidity'] is not None else float('inf'))
-            
             logger.info(f"🔍 Database query returned {len(sorted_machines) if isinstance(sorted_machines, list) else 'non-list'} results")
-            for i, machine in enumerate(sorted_machines[:limit]):
+            for i, machine in enumerate(sorted_machines):
                 logger.info(f"   {i+1}. {machine['machineid']}: {machine['humidity']}%")
             
-            return sorted_machines[:limit]
+            return sorted_machines
             
         except Exception as e:
             logger.error(f"❌ Error in get_machines_with_lowest_humidity: {e}")
             return []
 
 
+    @_read_cached
     def get_machines_with_lowest_vibration(self, limit=5):
         """Get machines with lowest current vibration level"""
-        query = """
-        SELECT DISTINCT ON (machineid) 
-            machineid,
-            vibrationlevel as vibration,
-            timestamp_epoch,
-            timestamp
-        FROM telemetry 
-        WHERE vibrationlevel IS NOT NULL
-        ORDER BY machineid, timestamp_epoch DESC
-        """
-        all_machines = self.execute_query(query)
-        
-        sorted_machines = sorted(all_machines, key=lambda x: x['vibration'])
-        return sorted_machines[:limit]
+        return self._top_n_by_metric("vibrationlevel", limit, "ASC", alias="vibration")
 
+    @_read_cached
     def get_machines_with_lowest_fuel_consumption(self, limit=5):
         """Get machines with lowest current fuel consumption"""
-        query = """
-        SELECT DISTINCT ON (machineid) 
-            machineid,
-            fuelconsumption as fuel,
-            timestamp_epoch,
-            timestamp
-        FROM telemetry 
-        WHERE fuelconsumption IS NOT NULL
-        ORDER BY machineid, timestamp_epoch DESC
-        """
-        all_machines = self.execute_query(query)
-        
-        sorted_machines = sorted(all_machines, key=lambda x: x['fuel'])
-        return sorted_machines[:limit]
+        return self._top_n_by_metric("fuelconsumption", limit, "ASC", alias="fuel")
+
 
+class AsyncDatabase:
+    """asyncpg read path for endpoints that fan out several queries at once.
 
+    Shares the SQL of Database; writes stay on the synchronous psycopg2 pool.
+    """
 
+    def __init__(self):
+        self.conn_params = _conn_params()
+        self.pool_max = int(os.getenv("DB_POOL_MAX", "16"))
+        self.pool = None
+        # Created on first use, inside the loop that will await it
+        self._connect_lock = None
+
+    async def connect(self):
+        try:
+            self.pool = await asyncpg.create_pool(
+                min_size=2, max_size=self.pool_max, init=self._init_connection, **self.conn_params
+            )
+            logger.info(f"✅ Connected to PostgreSQL via asyncpg (pool of up to {self.pool_max} connections)")
+        except Exception as e:
+            logger.error(f"❌ Async database connection failed: {e}")
+            raise
+
+    @staticmethod
+    async def _init_connection(conn):
+        # Decode REAL columns from their text form so 98.4 stays 98.4 instead of 98.4000015258789
+        await conn.set_type_codec("float4", schema="pg_catalog", encoder=str, decoder=float, format="text")
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def fetch(self, query, *args):
+        """Run a %s-style query (as used by Database) and return rows as dicts"""
+        plan = _plan(query)
+        if plan is None:
+            raise ValueError("AsyncDatabase.fetch supports positional %s placeholders only, not %(name)s")
+        if self.pool is None:
+            if self._connect_lock is None:
+                self._connect_lock = asyncio.Lock()
+            async with self._connect_lock:
+                if self.pool is None:
+                    await self.connect()
+        try:
+            rows = await self.pool.fetch(plan.numbered_sql, *args)
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"❌ Async query failed: {e}")
+            raise
+
+    async def get_telemetry_stats(self, machine_id=None):
+        """Get basic statistics for telemetry data"""
+        if machine_id:
+            return await self.fetch(_MACHINE_STATS_QUERY, machine_id)
+        return await self.fetch(_STATS_QUERY)
+
+    async def get_machines_with_highest_temperature(self, limit=5):
+        """Get machines with highest current temperature"""
+        return await self.fetch(_top_n_query("enginetemperature", "DESC", alias="temperature"), limit)
+
+    async def get_machines_with_highest_humidity(self, limit=5):
+        """Get machines with highest current humidity"""
+        return await self.fetch(_top_n_query("humidity", "DESC"), limit)
+
+    async def get_machines_with_highest_vibration(self, limit=5):
+        """Get machines with highest current vibration level"""
+        return await self.fetch(_top_n_query("vibrationlevel", "DESC", alias="vibration"), limit)
+
+    async def get_machines_with_highest_fuel_consumption(self, limit=5):
+        """Get machines with highest current fuel consumption"""
+        return await self.fetch(_top_n_query("fuelconsumption", "DESC", alias="fuel"), limit)